@@ -16,3 +16,10 @@ MQTT_TOPIC = os.environ.get("MQTT_TOPIC") or "agent"
 
 # Delay for sending data to mqtt in seconds
 DELAY = try_parse(float, os.environ.get("DELAY")) or 1
+# How long a read reuses the cached current time, in milliseconds
+CLOCK_CACHE_MS = try_parse(int, os.environ.get("CLOCK_CACHE_MS"))
+if CLOCK_CACHE_MS is None:
+    CLOCK_CACHE_MS = 10
+
+# Validate every CSV row with marshmallow on each read instead of once at start
+STRICT_VALIDATION = (os.environ.get("STRICT_VALIDATION") or "").lower() in ("1", "true")
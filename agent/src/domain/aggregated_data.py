@@ -5,9 +5,9 @@ from domain.accelerometer import Accelerometer
 from domain.gps import Gps
 
 
-@dataclass
+@dataclass(slots=True)
 class AggregatedData:
+    user_id: int
     accelerometer: Accelerometer
     gps: Gps
     timestamp: datetime
-    user_id: int
@@ -1,13 +1,17 @@
+import dataclasses
 from csv import reader, DictReader
 
+import numpy as np
+
 from domain.accelerometer import Accelerometer
 from domain.gps import Gps
 from domain.aggregated_data import AggregatedData
-from marshmallow import Schema
+from marshmallow import Schema, fields
 from schema.accelerometer_schema import AccelerometerSchema
 from schema.gps_schema import GpsSchema
 
 from datetime import datetime
+import time
 import config
 from enum import Enum
 
@@ -28,14 +32,18 @@ class FileDatasource:
 
         # Створення зчитувача GPS-даних і збереження їх у словнику
         self.readers[DataType.GPS] = CSVDatasourceReader(
-            gps_filename, GpsSchema()
+            gps_filename, GpsSchema(), Gps, config.STRICT_VALIDATION
         )
 
         # Створення зчитувача даних з акселерометра та збережіть їх у словнику
         self.readers[DataType.ACCELEROMETER] = CSVDatasourceReader(
-            accelerometer_filename, AccelerometerSchema()
+            accelerometer_filename, AccelerometerSchema(), Accelerometer, config.STRICT_VALIDATION
         )
 
+        # Кеш поточного часу для послідовних зчитувань
+        self._clock = None
+        self._clock_checked_ns = 0
+
     def read(self) -> AggregatedData:
         """Повертає агреговані дані, отримані з датчиків."""
         try:
@@ -43,20 +51,23 @@ class FileDatasource:
             acc = self.readers[DataType.ACCELEROMETER].read()
             gps = self.readers[DataType.GPS].read()
 
-            # Отримання поточної мітки часу та ідентифікатора користувача
-            ts = datetime.now()
+            # Отримання поточної мітки часу (кешованої на CLOCK_CACHE_MS) та ідентифікатора користувача
+            ts = self._now()
             id = config.USER_ID
 
             # Повернення агрегованих даних
-            return {
-            "user_id": id,
-            "accelerometer": acc,
-            "gps": gps,
-            "timestamp": ts
-        }
+            return AggregatedData(user_id=id, accelerometer=acc, gps=gps, timestamp=ts)
         except Exception as e:
             print(f"Reading data from sensors || Error: {e}")
 
+    def _now(self) -> datetime:
+        """Повертає поточний час, оновлюючи його не частіше ніж раз на CLOCK_CACHE_MS."""
+        monotonic_ns = time.monotonic_ns()
+        if monotonic_ns - self._clock_checked_ns >= config.CLOCK_CACHE_MS * 1_000_000:
+            self._clock = datetime.now()
+            self._clock_checked_ns = monotonic_ns
+        return self._clock
+
     def startReading(self, *args, **kwargs):
         """Викликається перед початком читання даних."""
         # Початок зчитування даних для всіх датчиків
@@ -73,36 +84,67 @@ class FileDatasource:
 class CSVDatasourceReader:
     """Клас для читання даних з CSV файлів."""
     filename: str
-    reader: DictReader
+    columns: dict
 
-    def __init__(self, filename, schema: Schema):
-        """Ініціалізація зчитувача джерел даних CSV ім'ям файлу та схемою."""
+    def __init__(self, filename, schema: Schema, domain_cls, strict: bool = False):
+        """Ініціалізація зчитувача джерел даних CSV ім'ям файлу, схемою та доменним класом."""
         self.filename = filename
         self.schema = schema
+        self.domain_cls = domain_cls
+        # У строгому режимі кожен рядок валідується схемою під час читання
+        self.strict = strict
+        self.columns = dict()
+        self._rows = []
+        self._casters = ()
+        self._n = 0
+        self._i = 0
 
     def startReading(self):
-        """Відкривання файлу CSV та ініціалізація зчитувача."""
-        self.file = open(self.filename, 'r')
-        self.reader = DictReader(self.file)
+        """Одноразове зчитування та валідація CSV-файлу у масиви стовпців."""
+        with open(self.filename, 'r') as file:
+            rows = list(DictReader(file))
+        self._n = len(rows)
+        self._i = 0
+
+        if self.strict:
+            self._rows = rows
+            return
+
+        rows = self.schema.load(rows, many=True)
+        # Порядок стовпців відповідає порядку полів доменного класу
+        names = [field.name for field in dataclasses.fields(self.domain_cls)]
+        self._casters = tuple(
+            int if isinstance(self.schema.fields[name], fields.Integer) else float
+            for name in names
+        )
+        # Перетворення рядків у типізовані масиви NumPy для кожного стовпця
+        self.columns = {
+            name: np.array(
+                [row[name] for row in rows],
+                dtype=np.int64 if caster is int else np.float64,
+            )
+            for name, caster in zip(names, self._casters)
+        }
 
     def read(self):
-        """Читання рядку даних з CSV-файлу."""
-        row = next(self.reader, None)
-
-        # Якщо досягнуто кінця файлу, перезавантажте зчитувач, щоб почати з початку
-        if row is None:
-            self.reset()
-            row = next(self.reader, None)
-
-        # Завантаження данних рядка за вказаною схемою
-        return self.schema.load(row)
+        """Читання рядку даних за поточним індексом."""
+        i = self._i
+        # Після останнього рядка починаємо з початку
+        self._i = (i + 1) % self._n
+
+        if self.strict:
+            return self.domain_cls(**self.schema.load(self._rows[i]))
+        return self.domain_cls(
+            *[cast(column[i]) for cast, column in zip(self._casters, self.columns.values())]
+        )
 
     def reset(self):
         """Перезавантажує зчитувач, щоб почати з початку файлу."""
-        self.file.seek(0)
-        self.reader = DictReader(self.file)
+        self._i = 0
 
     def stopReading(self):
-        """Закриває файл CSV."""
-        if self.file:
-            self.file.close()
\ No newline at end of file
+        """Звільняє завантажені дані CSV."""
+        self.columns = dict()
+        self._rows = []
+        self._n = 0
+        self._i = 0
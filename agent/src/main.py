@@ -1,7 +1,5 @@
 from paho.mqtt import client as mqtt_client
-import json
 import time
-from datetime import datetime
 from schema.aggregated_data_schema import AggregatedDataSchema
 from file_datasource import FileDatasource
 import config
@@ -27,10 +25,11 @@ def connect_mqtt(broker, port):
 
 def publish(client, topic, datasource, delay):
     datasource.startReading()
+    schema = AggregatedDataSchema()
     while True:
         time.sleep(delay)
         data = datasource.read()
-        msg = json.dumps(data, default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+        msg = schema.dumps(data)
         result = client.publish(topic, msg)
         # result: [0, 1]
         status = result[0]
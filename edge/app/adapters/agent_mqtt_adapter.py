@@ -1,8 +1,10 @@
 import logging
+import threading
+from typing import List
 import paho.mqtt.client as mqtt
 from app.interfaces.agent_gateway import AgentGateway
 from app.entities.agent_data import AgentData, GpsData
-from app.usecases.data_processing import process_agent_data
+from app.usecases.data_processing import process_agent_data_batch
 from app.interfaces.hub_gateway import HubGateway
 
 
@@ -14,8 +16,16 @@ class AgentMQTTAdapter(AgentGateway):
         topic,
         hub_gateway: HubGateway,
         batch_size=10,
+        batch_max_age=2.0,
     ):
         self.batch_size = batch_size
+        # Max seconds the oldest buffered item waits before a partial batch is flushed
+        self.batch_max_age = batch_max_age
+        self.agent_data_buffer: List[AgentData] = []
+        self._buffer_lock = threading.Lock()
+        # Serializes flushes from the MQTT and timer threads, keeping batches in order
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
         # MQTT
         self.broker_host = broker_host
         self.broker_port = broker_port
@@ -37,14 +47,45 @@ class AgentMQTTAdapter(AgentGateway):
             payload: str = msg.payload.decode("utf-8")
             # Create AgentData instance with the received data
             agent_data = AgentData.model_validate_json(payload, strict=True)
-            # Process the received data (you can call a use case here if needed)
-            processed_data = process_agent_data(agent_data)
-            # Store the agent_data in the database (you can send it to the data processing module)
-            if not self.hub_gateway.save_data(processed_data):
-                logging.error("Hub is not available")
+            # Accumulate agent data and process it in batches
+            with self._buffer_lock:
+                self.agent_data_buffer.append(agent_data)
+                if len(self.agent_data_buffer) == 1:
+                    # The first item of a batch starts the age timer
+                    self._flush_timer = threading.Timer(
+                        self.batch_max_age, self._flush_on_timer
+                    )
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                is_full = len(self.agent_data_buffer) >= self.batch_size
+            if is_full:
+                self.flush()
         except Exception as e:
             logging.info(f"Error processing MQTT message: {e}")
 
+    def _flush_on_timer(self):
+        """Flush a partial batch once its oldest item reaches batch_max_age"""
+        try:
+            self.flush()
+        except Exception as e:
+            logging.info(f"Error flushing agent data: {e}")
+
+    def flush(self):
+        """Process buffered agent data and send it to hub gateway"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                agent_data_batch = self.agent_data_buffer
+                self.agent_data_buffer = []
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            if not agent_data_batch:
+                return
+            for processed_data in process_agent_data_batch(agent_data_batch):
+                # Store the agent_data in the database (you can send it to the data processing module)
+                if not self.hub_gateway.save_data(processed_data):
+                    logging.error("Hub is not available")
+
     def connect(self):
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
@@ -55,6 +96,7 @@ class AgentMQTTAdapter(AgentGateway):
 
     def stop(self):
         self.client.loop_stop()
+        self.flush()
 
 
 # Usage example:
@@ -5,6 +5,9 @@ import requests as requests
 from app.entities.processed_agent_data import ProcessedAgentData
 from app.interfaces.hub_gateway import HubGateway
 
+# Shared HTTP session keeps connections to the Hub alive between requests
+session = requests.Session()
+
 
 class HubHttpAdapter(HubGateway):
     def __init__(self, api_base_url):
@@ -20,10 +23,13 @@ class HubHttpAdapter(HubGateway):
         """
         url = f"{self.api_base_url}/processed_agent_data/"
 
-        response = requests.post(url, data=processed_data.model_dump_json())
+        data = processed_data.model_dump_json()
+        response = session.post(
+            url, data=data, headers={"Content-Type": "application/json"}
+        )
         if response.status_code != 200:
             logging.info(
-                f"Invalid Hub response\nData: {processed_data.model_dump_json()}\nResponse: {response}"
+                f"Invalid Hub response\nData: {data}\nResponse: {response}"
             )
             return False
         return True
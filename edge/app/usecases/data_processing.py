@@ -1,20 +1,88 @@
+from typing import Final, List
+
+import numpy as np
+from numba import njit, prange
+
 from app.entities.agent_data import AgentData
 from app.entities.processed_agent_data import ProcessedAgentData
 
-pit_intervals = {
-    "normal": {
-        "start": 14000, 
-        "end": 18000
-        },
-    "small pits less": {
-        "start": 12000, 
-        "end": 14000
-        },
-    "small pits greater": {
-        "start": 18000, 
-        "end": 20000
-        }
-}
+# Road state intervals for accelerometer z-values
+NORMAL_LO: Final[float] = 14000.0
+NORMAL_HI: Final[float] = 18000.0
+SMALL_LO1: Final[float] = 12000.0
+SMALL_HI1: Final[float] = 14000.0
+SMALL_LO2: Final[float] = 18000.0
+SMALL_HI2: Final[float] = 20000.0
+
+# Road states indexed by the codes produced by _classify
+ROAD_STATES = np.array(["normal", "small pits", "large pits"])
+
+
+def classify_road_state(z: float) -> str:
+    """
+    Classify the state of the road surface for a single accelerometer z-value.
+    Parameters:
+        z (float): Accelerometer z-value.
+    Returns:
+        road_state (str): Road state ("normal", "small pits" or "large pits").
+    """
+    if NORMAL_LO < z <= NORMAL_HI:
+        return "normal"
+    if SMALL_LO1 < z < SMALL_HI1 or SMALL_LO2 < z < SMALL_HI2:
+        return "small pits"
+    return "large pits"
+
+
+@njit(cache=True, parallel=True)
+def _classify(zs: np.ndarray, out: np.ndarray):
+    """Fill out with road state codes (0 - normal, 1 - small pits, 2 - large pits)."""
+    for i in prange(zs.shape[0]):
+        z = zs[i]
+        # Branchless: combine comparison masks into the code instead of if/elif
+        normal = (z > NORMAL_LO) & (z <= NORMAL_HI)
+        small = ((z > SMALL_LO1) & (z < SMALL_HI1)) | ((z > SMALL_LO2) & (z < SMALL_HI2))
+        # normal -> 0, small (not normal) -> 1, neither -> 2
+        out[i] = (1 - normal) * (2 - small)
+
+
+def classify_road_states(zs: np.ndarray) -> np.ndarray:
+    """
+    Classify the state of the road surface for a batch of accelerometer z-values.
+    Parameters:
+        zs (np.ndarray): Accelerometer z-values.
+    Returns:
+        road_states (np.ndarray): Road state for every z-value ("normal", "small pits" or "large pits").
+    """
+    codes = np.empty(zs.shape[0], dtype=np.int8)
+    _classify(np.ascontiguousarray(zs, dtype=np.float64), codes)
+    return ROAD_STATES[codes]
+
+
+# Compile (or load from cache) the classifier at import time
+_classify(np.zeros(1, dtype=np.float64), np.empty(1, dtype=np.int8))
+
+
+def process_agent_data_batch(
+    agent_data_batch: List[AgentData],
+) -> List[ProcessedAgentData]:
+    """
+    Process a batch of agent data and classify the state of the road surface.
+    Parameters:
+        agent_data_batch (List[AgentData]): Agent data that containing accelerometer, GPS, and timestamp.
+    Returns:
+        processed_data_batch (List[ProcessedAgentData]): Processed data containing the classified state of the road surface and agent data.
+    """
+    zs = np.fromiter(
+        (agent_data.accelerometer.z for agent_data in agent_data_batch),
+        dtype=np.float64,
+        count=len(agent_data_batch),
+    )
+    road_states = classify_road_states(zs)
+    return [
+        ProcessedAgentData(road_state=str(road_state), agent_data=agent_data)
+        for road_state, agent_data in zip(road_states, agent_data_batch)
+    ]
+
 
 def process_agent_data(
     agent_data: AgentData,
@@ -26,13 +94,5 @@ def process_agent_data(
     Returns:
         processed_data_batch (ProcessedAgentData): Processed data containing the classified state of the road surface and agent data.
     """
-    # Implement it
-    z_acceleration = agent_data.accelerometer.z
-
-    if pit_intervals["normal"]["start"] < z_acceleration <= pit_intervals["normal"]["end"]:
-        road_state = "normal"
-    elif pit_intervals["small pits less"]["start"] < z_acceleration < pit_intervals["small pits less"]["end"] or pit_intervals["small pits greater"]["start"] < z_acceleration < pit_intervals["small pits greater"]["end"]:
-        road_state = "small pits"
-    else:
-        road_state = "large pits"
-    return ProcessedAgentData(road_state=road_state, agent_data=agent_data)
\ No newline at end of file
+    road_state = classify_road_state(agent_data.accelerometer.z)
+    return ProcessedAgentData(road_state=road_state, agent_data=agent_data)
@@ -8,6 +8,13 @@ def try_parse_int(value: str):
         return None
 
 
+def try_parse_float(value: str):
+    try:
+        return float(value)
+    except Exception:
+        return None
+
+
 # Configuration for agent MQTT
 MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST") or "localhost"
 MQTT_BROKER_PORT = try_parse_int(os.environ.get("MQTT_BROKER_PORT")) or 1883
@@ -22,3 +29,10 @@ HUB_MQTT_TOPIC = os.environ.get("HUB_MQTT_TOPIC") or "processed_agent_data_topic
 HUB_HOST = os.environ.get("HUB_HOST") or "localhost"
 HUB_PORT = try_parse_int(os.environ.get("HUB_PORT")) or 12000
 HUB_URL = f"http://{HUB_HOST}:{HUB_PORT}"
+
+# Configuration for agent data batching
+BATCH_SIZE = try_parse_int(os.environ.get("BATCH_SIZE")) or 10
+# Seconds a partial batch may wait before it is processed
+BATCH_MAX_AGE = try_parse_float(os.environ.get("BATCH_MAX_AGE"))
+if BATCH_MAX_AGE is None:
+    BATCH_MAX_AGE = 2.0
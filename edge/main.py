@@ -10,6 +10,8 @@ from config import (
     HUB_MQTT_BROKER_HOST,
     HUB_MQTT_BROKER_PORT,
     HUB_MQTT_TOPIC,
+    BATCH_SIZE,
+    BATCH_MAX_AGE,
 )
 
 if __name__ == "__main__":
@@ -37,6 +39,8 @@ if __name__ == "__main__":
         broker_port=MQTT_BROKER_PORT,
         topic=MQTT_TOPIC,
         hub_gateway=hub_adapter,
+        batch_size=BATCH_SIZE,
+        batch_max_age=BATCH_MAX_AGE,
     )
     try:
         # Connect to the MQTT broker and start listening for messages
@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from app.adapters.agent_mqtt_adapter import AgentMQTTAdapter
+from app.interfaces.hub_gateway import HubGateway
+
+def make_message(z):
+    payload = (
+        '{"user_id": 1, "accelerometer": {"x": 0.1, "y": 0.2, "z": %s}, '
+        '"gps": {"latitude": 10.123, "longitude": 20.456}, "timestamp": "2023-07-21T12:34:56"}'
+        % z
+    )
+    return Mock(payload=payload.encode("utf-8"))
+
+class TestAgentMQTTAdapter(unittest.TestCase):
+    def setUp(self):
+        # Create a mock HubGateway for testing
+        self.mock_hub_gateway = Mock(spec=HubGateway)
+        self.mock_hub_gateway.save_data.return_value = True
+
+    def make_adapter(self, batch_size, batch_max_age):
+        return AgentMQTTAdapter(
+            broker_host="test_broker",
+            broker_port=1234,
+            topic="test_topic",
+            hub_gateway=self.mock_hub_gateway,
+            batch_size=batch_size,
+            batch_max_age=batch_max_age,
+        )
+
+    def saved_road_states(self):
+        return [
+            call.args[0].road_state for call in self.mock_hub_gateway.save_data.call_args_list
+        ]
+
+    def test_partial_batch_is_buffered(self):
+        # Test that messages below batch_size are not sent before the age limit
+        adapter = self.make_adapter(batch_size=3, batch_max_age=60)
+        adapter.on_message(None, None, make_message(16000.0))
+        adapter.on_message(None, None, make_message(13000.0))
+        self.mock_hub_gateway.save_data.assert_not_called()
+        self.assertEqual(len(adapter.agent_data_buffer), 2)
+        adapter.stop()
+
+    def test_size_triggered_flush(self):
+        # Test that a full batch is classified and sent in order, leaving the rest buffered
+        adapter = self.make_adapter(batch_size=3, batch_max_age=60)
+        for z in (16000.0, 13000.0, 25000.0, 16000.0):
+            adapter.on_message(None, None, make_message(z))
+        self.assertEqual(self.saved_road_states(), ["normal", "small pits", "large pits"])
+        self.assertEqual(len(adapter.agent_data_buffer), 1)
+        adapter.stop()
+
+    def test_age_triggered_flush(self):
+        # Test that a partial batch is sent once its oldest item reaches batch_max_age
+        adapter = self.make_adapter(batch_size=10, batch_max_age=0.05)
+        adapter.on_message(None, None, make_message(16000.0))
+        deadline = time.monotonic() + 2
+        while not self.mock_hub_gateway.save_data.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.saved_road_states(), ["normal"])
+        self.assertEqual(adapter.agent_data_buffer, [])
+
+    def test_stop_flushes_remaining_data(self):
+        # Test that stopping the adapter sends the buffered partial batch
+        adapter = self.make_adapter(batch_size=10, batch_max_age=60)
+        adapter.on_message(None, None, make_message(19000.0))
+        adapter.stop()
+        self.assertEqual(self.saved_road_states(), ["small pits"])
+
+    def test_concurrent_flushes_send_every_item_once(self):
+        # Test that flushes from several threads neither lose nor duplicate data
+        adapter = self.make_adapter(batch_size=2, batch_max_age=0.001)
+        threads = [
+            threading.Thread(
+                target=lambda: [adapter.on_message(None, None, make_message(16000.0)) for _ in range(50)]
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        adapter.stop()
+        self.assertEqual(self.mock_hub_gateway.save_data.call_count, 200)
+
+    def test_invalid_message_is_ignored(self):
+        # Test that invalid data is not buffered or sent
+        adapter = self.make_adapter(batch_size=1, batch_max_age=60)
+        adapter.on_message(None, None, Mock(payload=b'{"user_id": 1}'))
+        self.mock_hub_gateway.save_data.assert_not_called()
+        self.assertEqual(adapter.agent_data_buffer, [])
+
+if __name__ == "__main__":
+    unittest.main()
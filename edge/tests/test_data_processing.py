@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from app.usecases.data_processing import classify_road_state, classify_road_states
+
+class TestDataProcessing(unittest.TestCase):
+    def setUp(self):
+        # Interval boundaries and their neighbours, where the classifiers are most likely to disagree
+        boundaries = [12000, 14000, 18000, 20000]
+        self.zs = np.array(
+            [float(b + d) for b in boundaries for d in (-1, 0, 1)], dtype=np.float64
+        )
+
+    def test_batch_matches_scalar_on_boundaries(self):
+        # Test that the batch kernel classifies every boundary value like the scalar classifier
+        expected = [classify_road_state(z) for z in self.zs]
+        self.assertEqual(classify_road_states(self.zs).tolist(), expected)
+
+    def test_non_finite_values(self):
+        # Test that NaN and infinities are large pits in both the batch and the scalar classifier
+        zs = np.array([np.nan, np.inf, -np.inf], dtype=np.float64)
+        expected = ["large pits", "large pits", "large pits"]
+        self.assertEqual([classify_road_state(z) for z in zs], expected)
+        self.assertEqual(classify_road_states(zs).tolist(), expected)
+
+    def test_boundary_classification(self):
+        # Test the expected road state for each boundary value
+        expected = [
+            "large pits", "large pits", "small pits",  # 11999, 12000, 12001
+            "small pits", "large pits", "normal",  # 13999, 14000, 14001
+            "normal", "normal", "small pits",  # 17999, 18000, 18001
+            "small pits", "large pits", "large pits",  # 19999, 20000, 20001
+        ]
+        self.assertEqual([classify_road_state(z) for z in self.zs], expected)
+
+if __name__ == "__main__":
+    unittest.main()
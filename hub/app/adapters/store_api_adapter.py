@@ -1,16 +1,54 @@
-import json
 import logging
+import threading
+from datetime import datetime, timezone
 from typing import List
+import numpy as np
+import pyarrow as pa
 import requests
 from app.entities.processed_agent_data import ProcessedAgentData
 from app.interfaces.store_gateway import StoreGateway
 
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Схема Arrow для пакету оброблених даних
+PROCESSED_AGENT_DATA_SCHEMA = pa.schema(
+    [
+        ("road_state", pa.string()),
+        ("user_id", pa.int64()),
+        ("x", pa.float64()),
+        ("y", pa.float64()),
+        ("z", pa.float64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("timestamp", pa.timestamp("us")),
+    ]
+)
+# Спільна HTTP-сесія з keep-alive з'єднаннями до API магазину
+session = requests.Session()
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Перетворення мітки часу у UTC без часового поясу."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 
 class StoreApiAdapter(StoreGateway):
     def __init__(self, api_base_url, buffer_size=10):
         self.api_base_url = api_base_url  # Базовий URL API
         self.buffer_size = buffer_size  # Розмір буфера
-        self.buffer: List[ProcessedAgentData] = []  # Буфер
+        # Буфер у вигляді окремих масивів для кожного стовпця
+        self._road_state = np.empty(buffer_size, dtype=object)
+        self._user_id = np.empty(buffer_size, dtype=np.int64)
+        self._x = np.empty(buffer_size, dtype=np.float64)
+        self._y = np.empty(buffer_size, dtype=np.float64)
+        self._z = np.empty(buffer_size, dtype=np.float64)
+        self._latitude = np.empty(buffer_size, dtype=np.float64)
+        self._longitude = np.empty(buffer_size, dtype=np.float64)
+        self._timestamp = np.empty(buffer_size, dtype="datetime64[us]")
+        self._n = 0  # Кількість записів у буфері
+        # save_data викликається з потоку MQTT та з обробника FastAPI
+        self._lock = threading.Lock()
 
     def save_data(self, processed_agent_data_batch: List[ProcessedAgentData]):
         """
@@ -22,49 +60,77 @@ class StoreApiAdapter(StoreGateway):
         """
         # Реалізуємо функціонал
         try:
-            # Додаємо дані пакету до буфера
-            self.buffer.extend(processed_agent_data_batch)
-            if len(self.buffer) >= self.buffer_size:
-                success = self.send_data(
-                    self.buffer
-                )  # Якщо досягнуто розміру буфера, відправляємо дані
-                # Очищення буфера після відправлення
-                self.buffer.clear()
-                return success
-            else:
-                return True
+            payloads = []
+            with self._lock:
+                for data in processed_agent_data_batch:
+                    # Додаємо дані до буфера
+                    n = self._n
+                    self._road_state[n] = data.road_state
+                    self._user_id[n] = data.agent_data.user_id
+                    self._x[n] = data.agent_data.accelerometer.x
+                    self._y[n] = data.agent_data.accelerometer.y
+                    self._z[n] = data.agent_data.accelerometer.z
+                    self._latitude[n] = data.agent_data.gps.latitude
+                    self._longitude[n] = data.agent_data.gps.longitude
+                    self._timestamp[n] = to_naive_utc(data.agent_data.timestamp)
+                    self._n = n + 1
+                    if self._n == self.buffer_size:
+                        # Якщо досягнуто розміру буфера, серіалізуємо та очищуємо його
+                        payloads.append(self.take_buffer())
+            # Відправлення даних поза блокуванням
+            success = True
+            for arrow_data in payloads:
+                success = self.send_data(arrow_data) and success
+            return success
         except Exception as e:
             logging.error(f"Виникла помилка: {e}")
             return False
 
-    def processed_agent_data_list_to_list_of_dict(
-        self, data_list: List[ProcessedAgentData]
-    ):
+    def buffer_to_arrow(self) -> bytes:
         """
-        Перетворення списку ProcessedAgentData на список словників.
+        Серіалізація заповненої частини буфера у потік Arrow IPC.
         """
-        processed_data = []
-        for data in data_list:
-            # Перетворення ProcessedAgentData у словник
-            processed_data.append(data.model_dump())
+        n = self._n
+        batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(self._road_state[:n], type=pa.string()),
+                pa.array(self._user_id[:n]),
+                pa.array(self._x[:n]),
+                pa.array(self._y[:n]),
+                pa.array(self._z[:n]),
+                pa.array(self._latitude[:n]),
+                pa.array(self._longitude[:n]),
+                pa.array(self._timestamp[:n]),
+            ],
+            schema=PROCESSED_AGENT_DATA_SCHEMA,
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, PROCESSED_AGENT_DATA_SCHEMA) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
 
-        for data in processed_data:
-            # Серіалізація мітки часу у формат ISO
-            data["agent_data"]["timestamp"] = data["agent_data"][
-                "timestamp"
-            ].isoformat()
-
-        return processed_data
+    def take_buffer(self) -> bytes:
+        """
+        Серіалізація буфера у потік Arrow IPC та його очищення.
+        Викликається під блокуванням self._lock.
+        """
+        try:
+            return self.buffer_to_arrow()
+        finally:
+            self._n = 0
 
-    def send_data(self, data: List[ProcessedAgentData]) -> bool:
+    def send_data(self, arrow_data: bytes) -> bool:
         """
-        Відправлення накопичених даних до API магазину.
+        Відправлення серіалізованих даних до API магазину.
         """
         url = f"{self.api_base_url}/processed_agent_data/"
         try:
-            json_data = self.processed_agent_data_list_to_list_of_dict(data)
             # Відправлення POST-запиту на API
-            response = requests.post(url, json=json_data)
+            response = session.post(
+                url,
+                data=arrow_data,
+                headers={"Content-Type": ARROW_STREAM_MEDIA_TYPE},
+            )
             if response.ok:  # Перевірка успішності запиту
                 return True
             else:
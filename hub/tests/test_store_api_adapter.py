@@ -1,23 +1,24 @@
 import datetime
+import threading
 from datetime import UTC
 
-import requests
+import pyarrow as pa
 import unittest
 from unittest.mock import Mock, patch
 
 from pydantic_core._pydantic_core import TzInfo
 
-from app.adapters.store_api_adapter import StoreApiAdapter
+from app.adapters import store_api_adapter
+from app.adapters.store_api_adapter import ARROW_STREAM_MEDIA_TYPE, StoreApiAdapter
 from app.entities.agent_data import AccelerometerData, AgentData, GpsData
 from app.entities.processed_agent_data import ProcessedAgentData
 
 class TestStoreApiAdapter(unittest.TestCase):
     def setUp(self):
         # Create the StoreApiAdapter instance
-        self.store_api_adapter = StoreApiAdapter(api_base_url="http://test-api.com")
-    @patch.object(requests, "post")
-    def test_save_data_success(self, mock_post):
-        # Test successful saving of data to the Store API
+        self.store_api_adapter = StoreApiAdapter(
+            api_base_url="http://test-api.com", buffer_size=1
+        )
         # Sample processed road data
         agent_data = AgentData(
             user_id=1,
@@ -32,48 +33,87 @@ class TestStoreApiAdapter(unittest.TestCase):
             ),
             timestamp="2023-07-21T12:34:56Z",
         )
-        processed_data = ProcessedAgentData(road_state="normal", agent_data=agent_data)
+        self.processed_data = ProcessedAgentData(road_state="normal", agent_data=agent_data)
+        self.expected_row = {
+            "road_state": "normal",
+            "user_id": 1,
+            "x": 0.1,
+            "y": 0.2,
+            "z": 0.3,
+            "latitude": 10.123,
+            "longitude": 20.456,
+            "timestamp": datetime.datetime(2023, 7, 21, 12, 34, 56),
+        }
+
+    def assert_posted_rows(self, mock_post, expected_rows):
+        # Ensure that the post method of the mock is called with an Arrow stream of the expected rows
+        args, kwargs = mock_post.call_args
+        self.assertEqual(args, ("http://test-api.com/processed_agent_data/",))
+        self.assertEqual(kwargs["headers"], {"Content-Type": ARROW_STREAM_MEDIA_TYPE})
+        table = pa.ipc.open_stream(kwargs["data"]).read_all()
+        self.assertEqual(table.to_pylist(), expected_rows)
+
+    @patch.object(store_api_adapter.session, "post")
+    def test_save_data_success(self, mock_post):
+        # Test successful saving of data to the Store API
         # Mock the response from the Store API
-        mock_response = Mock(status_code=201)  # 201 indicates successful creation
+        mock_response = Mock(ok=True, status_code=201)  # 201 indicates successful creation
         mock_post.return_value = mock_response
         # Call the save_data method
-        result = self.store_api_adapter.save_data([processed_data])
-        # Ensure that the post method of the mock is called with the correct arguments
-        mock_post.assert_called_once_with(
-            "http://test-api.com/agent_data", json=[processed_data.model_dump()]
-        )
+        result = self.store_api_adapter.save_data([self.processed_data])
+        mock_post.assert_called_once()
+        self.assert_posted_rows(mock_post, [self.expected_row])
         # Ensure that the result is True, indicating successful saving
         self.assertTrue(result)
-        
-    @patch.object(requests, "post")
+
+    @patch.object(store_api_adapter.session, "post")
     def test_save_data_failure(self, mock_post):
         # Test failure to save data to the Store API
-        # Sample processed road data
-        agent_data = AgentData(
-            user_id=1,
-            accelerometer=AccelerometerData(
-                x=0.1,
-                y=0.2,
-                z=0.3,
-            ),
-            gps=GpsData(
-                latitude=10.123,
-                longitude=20.456,
-            ),
-            timestamp="2023-07-21T12:34:56Z",
-        )
-        processed_data = ProcessedAgentData(road_state="normal", agent_data=agent_data)
         # Mock the response from the Store API
-        mock_response = Mock(status_code=400)  # 400 indicates a client error
+        mock_response = Mock(ok=False, status_code=400)  # 400 indicates a client error
         mock_post.return_value = mock_response
         # Call the save_data method
-        result = self.store_api_adapter.save_data([processed_data])
-        # Ensure that the post method of the mock is called with the correct arguments
-        mock_post.assert_called_once_with(
-            "http://test-api.com/agent_data", json=[processed_data.model_dump()]
-        )
+        result = self.store_api_adapter.save_data([self.processed_data])
+        mock_post.assert_called_once()
+        self.assert_posted_rows(mock_post, [self.expected_row])
         # Ensure that the result is False, indicating failure to save
         self.assertFalse(result)
+        # Ensure that the buffer is emptied even when sending fails
+        self.assertEqual(self.store_api_adapter._n, 0)
+
+    @patch.object(store_api_adapter.session, "post")
+    def test_save_data_flushes_in_the_middle_of_a_batch(self, mock_post):
+        # Test that a full buffer is sent while the rest of the batch stays buffered
+        adapter = StoreApiAdapter(api_base_url="http://test-api.com", buffer_size=3)
+        mock_post.return_value = Mock(ok=True, status_code=201)
+        result = adapter.save_data([self.processed_data] * 5)
+        mock_post.assert_called_once()
+        self.assert_posted_rows(mock_post, [self.expected_row] * 3)
+        self.assertEqual(adapter._n, 2)
+        self.assertTrue(result)
+
+    @patch.object(store_api_adapter.session, "post")
+    def test_save_data_from_concurrent_threads(self, mock_post):
+        # Test that concurrent callers (MQTT thread and FastAPI handler) lose no rows
+        adapter = StoreApiAdapter(api_base_url="http://test-api.com", buffer_size=7)
+        mock_post.return_value = Mock(ok=True, status_code=201)
+        threads = [
+            threading.Thread(
+                target=lambda: [adapter.save_data([self.processed_data]) for _ in range(50)]
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        posted = sum(
+            pa.ipc.open_stream(kwargs["data"]).read_all().num_rows
+            for _, kwargs in mock_post.call_args_list
+        )
+        # 200 rows: 28 full buffers of 7 are sent and 4 rows stay buffered
+        self.assertEqual(posted, 196)
+        self.assertEqual(adapter._n, 4)
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -14,3 +14,8 @@ POSTGRES_PORT = try_parse(int, os.environ.get("POSTGRES_PORT")) or 5432
 POSTGRES_USER = os.environ.get("POSTGRES_USER") or "user"
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASS") or "pass"
 POSTGRES_DB = os.environ.get("POSTGRES_DB") or "test_db"
+
+# Batches with at least this many rows are inserted with COPY
+COPY_MIN_ROWS = try_parse(int, os.environ.get("COPY_MIN_ROWS"))
+if COPY_MIN_ROWS is None:
+    COPY_MIN_ROWS = 2
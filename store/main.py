@@ -1,9 +1,12 @@
 import asyncio
-import json
-from typing import Set, Dict, List, Any
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Body
+from collections import defaultdict
+from typing import Set, Dict, List, Any, Union
+import msgspec
+import orjson
+import pyarrow as pa
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, Body
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy import (
-    create_engine,
     MetaData,
     Table,
     Column,
@@ -12,9 +15,9 @@ from sqlalchemy import (
     Float,
     DateTime,
 )
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import select, update, delete
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.sql import bindparam, select, text, update, delete
+from datetime import datetime, timezone
 from pydantic import BaseModel, field_validator
 from config import (
     POSTGRES_HOST,
@@ -22,13 +25,16 @@ from config import (
     POSTGRES_DB,
     POSTGRES_USER,
     POSTGRES_PASSWORD,
+    COPY_MIN_ROWS,
 )
 
 # FastAPI app setup
 app = FastAPI()
 # SQLAlchemy setup
-DATABASE_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+engine = create_async_engine(
+    DATABASE_URL, pool_size=20, max_overflow=40, pool_recycle=3600
+)
 metadata = MetaData()
 # Define the ProcessedAgentData table
 processed_agent_data = Table(
@@ -44,7 +50,30 @@ processed_agent_data = Table(
     Column("longitude", Float),
     Column("timestamp", DateTime),
 )
-SessionLocal = sessionmaker(bind=engine)
+SessionLocal = async_sessionmaker(bind=engine)
+
+
+async def get_db():
+    # One session per request, closed when the response is done
+    async with SessionLocal() as db:
+        yield db
+
+
+# Statements built once and reused by the GET endpoints
+SELECT_BY_ID = select(processed_agent_data).where(
+    processed_agent_data.c.id == bindparam("processed_agent_data_id")
+)
+SELECT_PAGE = (
+    select(processed_agent_data)
+    .order_by(processed_agent_data.c.id)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+# Reserves ids from the serial sequence for rows loaded with COPY
+SELECT_NEXT_IDS = text(
+    "SELECT nextval(pg_get_serial_sequence('processed_agent_data', 'id')) "
+    "FROM generate_series(1, :count)"
+)
 
 
 # SQLAlchemy model
@@ -96,8 +125,133 @@ class ProcessedAgentData(BaseModel):
     agent_data: AgentData
 
 
+# msgspec structs used to decode JSON batches in a single pass
+class AccelerometerStruct(msgspec.Struct):
+    x: float
+    y: float
+    z: float
+
+
+class GpsStruct(msgspec.Struct):
+    latitude: float
+    longitude: float
+
+
+class AgentDataStruct(msgspec.Struct):
+    user_id: int
+    accelerometer: AccelerometerStruct
+    gps: GpsStruct
+    timestamp: datetime
+
+
+class ProcessedAgentDataStruct(msgspec.Struct):
+    road_state: str
+    agent_data: AgentDataStruct
+
+
+processed_agent_data_list_decoder = msgspec.json.Decoder(List[ProcessedAgentDataStruct])
+
+# Arrow IPC stream format used by the hub to send batches
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Expected Arrow schema of a batch, matching the hub's PROCESSED_AGENT_DATA_SCHEMA
+PROCESSED_AGENT_DATA_SCHEMA = pa.schema(
+    [
+        ("road_state", pa.string()),
+        ("user_id", pa.int64()),
+        ("x", pa.float64()),
+        ("y", pa.float64()),
+        ("z", pa.float64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("timestamp", pa.timestamp("us")),
+    ]
+)
+PROCESSED_AGENT_DATA_COLUMNS = PROCESSED_AGENT_DATA_SCHEMA.names
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    # asyncpg rejects aware datetimes for TIMESTAMP WITHOUT TIME ZONE columns
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def processed_agent_data_to_row(
+    item: Union[ProcessedAgentData, ProcessedAgentDataStruct]
+) -> Dict[str, Any]:
+    return {
+        "road_state": item.road_state,
+        "user_id": item.agent_data.user_id,
+        "x": item.agent_data.accelerometer.x,
+        "y": item.agent_data.accelerometer.y,
+        "z": item.agent_data.accelerometer.z,
+        "latitude": item.agent_data.gps.latitude,
+        "longitude": item.agent_data.gps.longitude,
+        "timestamp": to_naive_utc(item.agent_data.timestamp),
+    }
+
+
+def conform_arrow_table(table: pa.Table) -> pa.Table:
+    # Check the columns against PROCESSED_AGENT_DATA_SCHEMA, reporting every mismatch
+    columns = []
+    errors = []
+    for field in PROCESSED_AGENT_DATA_SCHEMA:
+        loc = ("body", field.name)
+        if field.name not in table.column_names:
+            errors.append({"loc": loc, "msg": "Field required", "type": "missing"})
+            continue
+        column = table.column(field.name)
+        if pa.types.is_timestamp(column.type):
+            try:
+                # Arrow keeps aware timestamps in UTC, so dropping the zone gives naive UTC
+                column = column.cast(field.type)
+            except pa.ArrowInvalid as e:
+                errors.append({"loc": loc, "msg": str(e), "type": "value_error"})
+                continue
+        if column.type != field.type:
+            errors.append(
+                {
+                    "loc": loc,
+                    "msg": f"Expected type {field.type}, got {column.type}",
+                    "type": "type_error",
+                }
+            )
+        elif column.null_count:
+            errors.append({"loc": loc, "msg": "Null values are not allowed", "type": "value_error"})
+        columns.append(column)
+    if errors:
+        raise RequestValidationError(errors)
+    return pa.Table.from_arrays(columns, schema=PROCESSED_AGENT_DATA_SCHEMA)
+
+
+async def read_processed_agent_data_rows(request: Request) -> List[Dict[str, Any]]:
+    # Accept either an Arrow IPC stream or a JSON list of ProcessedAgentData
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(ARROW_STREAM_MEDIA_TYPE):
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowException as e:
+            raise HTTPException(status_code=400, detail=f"Invalid Arrow stream: {e}")
+        return conform_arrow_table(table).to_pylist()
+    try:
+        data = processed_agent_data_list_decoder.decode(body)
+    except msgspec.ValidationError as e:
+        raise RequestValidationError(
+            [{"loc": ("body",), "msg": str(e), "type": "value_error"}]
+        )
+    except msgspec.DecodeError as e:
+        raise RequestValidationError(
+            [{"loc": ("body",), "msg": str(e), "type": "json_invalid"}]
+        )
+    return [processed_agent_data_to_row(item) for item in data]
+
+
 # WebSocket subscriptions
 subscriptions: Dict[int, Set[WebSocket]] = {}
+# Per-user outgoing message queues and the tasks draining them
+queues: Dict[int, asyncio.Queue] = {}
+drain_tasks: Dict[int, asyncio.Task] = {}
+QUEUE_MAX_SIZE = 1024
 
 
 # FastAPI WebSocket endpoint
@@ -106,126 +260,195 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
     await websocket.accept()
     if user_id not in subscriptions:
         subscriptions[user_id] = set()
+        queues[user_id] = asyncio.Queue(maxsize=QUEUE_MAX_SIZE)
+        drain_tasks[user_id] = asyncio.create_task(drain_queue(user_id))
     subscriptions[user_id].add(websocket)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
         subscriptions[user_id].remove(websocket)
+        if not subscriptions[user_id]:
+            # No sockets left for this user: stop draining and drop the queue
+            del subscriptions[user_id]
+            del queues[user_id]
+            drain_tasks.pop(user_id).cancel()
+
+
+# Background task sending queued messages to the user's websockets
+async def drain_queue(user_id: int):
+    queue = queues[user_id]
+    while True:
+        message = await queue.get()
+        await asyncio.gather(
+            *(websocket.send_bytes(message) for websocket in list(subscriptions.get(user_id, ()))),
+            return_exceptions=True,
+        )
 
 
 # Function to send data to subscribed users
-async def send_data_to_subscribers(user_id: int, data):
-    if user_id in subscriptions:
-        for websocket in subscriptions[user_id]:
-            await websocket.send_json(json.dumps(data))
+def send_data_to_subscribers(user_id: int, data: List[Dict[str, Any]]):
+    queue = queues.get(user_id)
+    if queue is None:
+        return
+    # Serialize once per user, not once per websocket
+    message = orjson.dumps(data)
+    if queue.full():
+        # Drop the oldest message so slow clients never block the request
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+async def copy_processed_agent_data(
+    db: AsyncSession, rows: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    # COPY does not return ids, so reserve them from the sequence beforehand
+    ids = (await db.execute(SELECT_NEXT_IDS, {"count": len(rows)})).scalars().all()
+    inserted = [{"id": row_id, **row} for row_id, row in zip(ids, rows)]
+    columns = ["id", *PROCESSED_AGENT_DATA_COLUMNS]
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        processed_agent_data.name,
+        records=[tuple(row[column] for column in columns) for row in inserted],
+        columns=columns,
+    )
+    return inserted
 
 
 # FastAPI CRUDL endpoints
 
-@app.post("/processed_agent_data/")
-async def create_processed_agent_data(data: List[ProcessedAgentData]):
+@app.post(
+    "/processed_agent_data/",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/ProcessedAgentData"},
+                    }
+                },
+                ARROW_STREAM_MEDIA_TYPE: {
+                    "schema": {
+                        "type": "string",
+                        "format": "binary",
+                        "description": "Arrow IPC stream with columns road_state, user_id, "
+                        "x, y, z, latitude, longitude, timestamp",
+                    }
+                },
+            },
+        }
+    },
+)
+async def create_processed_agent_data(
+    request: Request, db: AsyncSession = Depends(get_db)
+):
     # Вставка даних до бази даних
     # Відправка даних підписникам
-    with SessionLocal() as db:
-        for item in data:
-            try:
-                # Створення запиту на вставку даних
-                query = processed_agent_data.insert().values(
-                    road_state=item.road_state,
-                    user_id=item.agent_data.user_id,
-                    x=item.agent_data.accelerometer.x,
-                    y=item.agent_data.accelerometer.y,
-                    z=item.agent_data.accelerometer.z,
-                    latitude=item.agent_data.gps.latitude,
-                    longitude=item.agent_data.gps.longitude,
-                    timestamp=item.agent_data.timestamp
-                )
-
-                # Виконання запиту та збереження результату
-                result = db.execute(query)
-                db.commit()
-
-                # Відправка даних підписникам
-                await send_data_to_subscribers(item.agent_data.user_id, result)
-            except Exception as e:
-                # У випадку помилки відкат змін до попереднього стану
-                db.rollback()
-                raise e
+    rows = await read_processed_agent_data_rows(request)
+    if not rows:
+        return
+    try:
+        # Вставка всього пакету через COPY (або INSERT для малих пакетів) та одна фіксація транзакції
+        if len(rows) >= COPY_MIN_ROWS:
+            inserted = await copy_processed_agent_data(db, rows)
+        else:
+            query = processed_agent_data.insert().returning(processed_agent_data)
+            result = await db.execute(query, rows)
+            inserted = [row._asdict() for row in result]
+        await db.commit()
+    except Exception as e:
+        # У випадку помилки відкат змін до попереднього стану
+        await db.rollback()
+        raise e
+
+    # Групування даних за користувачами та постановка в черги відправки підписникам
+    by_user: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for row in inserted:
+        by_user[row["user_id"]].append(row)
+    for user_id, rows in by_user.items():
+        send_data_to_subscribers(user_id, rows)
 
 
 @app.get(
     "/processed_agent_data/{processed_agent_data_id}",
     response_model=ProcessedAgentDataInDB,
 )
-def read_processed_agent_data(processed_agent_data_id: int):
+async def read_processed_agent_data(
+    processed_agent_data_id: int, db: AsyncSession = Depends(get_db)
+):
     # Отримання даних за ідентифікатором
-    with SessionLocal() as session:
-        # Створення запиту на отримання даних за ідентифікатором
-        query = select(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        result = session.execute(query).first()
-        if not result:
-            # Якщо дані не знайдено, викидаємо HTTP помилку
-            raise HTTPException(status_code=404, detail="Data not found")
-        return result
+    result = (
+        await db.execute(
+            SELECT_BY_ID, {"processed_agent_data_id": processed_agent_data_id}
+        )
+    ).first()
+    if not result:
+        # Якщо дані не знайдено, викидаємо HTTP помилку
+        raise HTTPException(status_code=404, detail="Data not found")
+    return result
 
 
 @app.get("/processed_agent_data/", response_model=list[ProcessedAgentDataInDB])
-def list_processed_agent_data():
-    # Отримання списку даних
-    with SessionLocal() as session:
-        # Створення запиту на отримання всіх даних
-        query = select(processed_agent_data)
-        result = session.execute(query).fetchall()
-        return result
+async def list_processed_agent_data(
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    # Отримання сторінки даних
+    result = (
+        await db.execute(SELECT_PAGE, {"limit": limit, "offset": offset})
+    ).fetchall()
+    return result
 
 
 @app.put(
     "/processed_agent_data/{processed_agent_data_id}",
     response_model=ProcessedAgentDataInDB,
 )
-def update_processed_agent_data(processed_agent_data_id: int, data: ProcessedAgentData):
+async def update_processed_agent_data(
+    processed_agent_data_id: int,
+    data: ProcessedAgentData,
+    db: AsyncSession = Depends(get_db),
+):
     # Оновлення даних
-    with SessionLocal() as session:
-        # Створення запиту на оновлення даних за ідентифікатором
-        query = update(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id).values(
-            road_state=data.road_state,
-            user_id=data.agent_data.user_id,
-            x=data.agent_data.accelerometer.x,
-            y=data.agent_data.accelerometer.y,
-            z=data.agent_data.accelerometer.z,
-            latitude=data.agent_data.gps.latitude,
-            longitude=data.agent_data.gps.longitude,
-            timestamp=data.agent_data.timestamp
-        )
-        result = session.execute(query)
-        if not result:
-            # Якщо дані не знайдено, викидаємо HTTP помилку
-            raise HTTPException(status_code=404, detail="Data not found")
-        session.commit()
-        # Отримання оновлених даних
-        updated = select(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        return session.execute(updated).first()
+    # Створення запиту на оновлення даних за ідентифікатором з поверненням оновленого рядка
+    query = (
+        update(processed_agent_data)
+        .where(processed_agent_data.c.id == processed_agent_data_id)
+        .values(**processed_agent_data_to_row(data))
+        .returning(processed_agent_data)
+    )
+    updated = (await db.execute(query)).first()
+    if updated is None:
+        # Якщо дані не знайдено, викидаємо HTTP помилку
+        raise HTTPException(status_code=404, detail="Data not found")
+    await db.commit()
+    return updated
 
 
 @app.delete(
     "/processed_agent_data/{processed_agent_data_id}",
     response_model=ProcessedAgentDataInDB,
 )
-def delete_processed_agent_data(processed_agent_data_id: int):
+async def delete_processed_agent_data(
+    processed_agent_data_id: int, db: AsyncSession = Depends(get_db)
+):
     # Видалення за ідентифікатором
-    with SessionLocal() as session:
-        # Створення запиту на отримання об'єкта за ідентифікатором
-        to_delete = select(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        obj_to_delete = session.execute(to_delete).first()
-        # Створення запиту на видалення об'єкта за ідентифікатором
-        query = delete(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        result = session.execute(query)
-        if not result:
-            # Якщо дані не знайдено, викидаємо HTTP помилку
-            raise HTTPException(status_code=404, detail="Data not found")
-        session.commit()
-        return obj_to_delete
+    # Створення запиту на видалення об'єкта за ідентифікатором з поверненням видаленого рядка
+    query = (
+        delete(processed_agent_data)
+        .where(processed_agent_data.c.id == processed_agent_data_id)
+        .returning(processed_agent_data)
+    )
+    deleted = (await db.execute(query)).first()
+    if deleted is None:
+        # Якщо дані не знайдено, викидаємо HTTP помилку
+        raise HTTPException(status_code=404, detail="Data not found")
+    await db.commit()
+    return deleted
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import unittest
+
+import orjson
+import pyarrow as pa
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+
+import main
+from main import (
+    ARROW_STREAM_MEDIA_TYPE,
+    PROCESSED_AGENT_DATA_SCHEMA,
+    conform_arrow_table,
+    read_processed_agent_data_rows,
+    send_data_to_subscribers,
+)
+
+class FakeRequest:
+    # Minimal stand-in for fastapi.Request: only the body and the content type are read
+    def __init__(self, body, content_type):
+        self._body = body
+        self.headers = {"content-type": content_type}
+
+    async def body(self):
+        return self._body
+
+def to_arrow_stream(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+class TestConformArrowTable(unittest.TestCase):
+    def setUp(self):
+        # Sample row matching PROCESSED_AGENT_DATA_SCHEMA
+        self.row = {
+            "road_state": "normal",
+            "user_id": 1,
+            "x": 0.1,
+            "y": 0.2,
+            "z": 0.3,
+            "latitude": 10.123,
+            "longitude": 20.456,
+            "timestamp": datetime.datetime(2023, 7, 21, 12, 34, 56),
+        }
+
+    def assert_error(self, table, field, error_type):
+        # Ensure that the table is rejected with an error for the given field
+        with self.assertRaises(RequestValidationError) as cm:
+            conform_arrow_table(table)
+        errors = [(e["loc"], e["type"]) for e in cm.exception.errors()]
+        self.assertIn((("body", field), error_type), errors)
+
+    def test_valid_table(self):
+        # Test that a table with the expected schema passes unchanged
+        table = pa.Table.from_pylist([self.row], schema=PROCESSED_AGENT_DATA_SCHEMA)
+        self.assertEqual(conform_arrow_table(table).to_pylist(), [self.row])
+
+    def test_missing_column(self):
+        # Test that a missing column is reported as a 422 validation error
+        table = pa.Table.from_pylist([self.row], schema=PROCESSED_AGENT_DATA_SCHEMA).drop_columns(["z"])
+        self.assert_error(table, "z", "missing")
+
+    def test_wrong_column_type(self):
+        # Test that a column of the wrong type is reported as a 422 validation error
+        schema = PROCESSED_AGENT_DATA_SCHEMA.set(
+            PROCESSED_AGENT_DATA_SCHEMA.get_field_index("user_id"), pa.field("user_id", pa.string())
+        )
+        table = pa.Table.from_pylist([dict(self.row, user_id="1")], schema=schema)
+        self.assert_error(table, "user_id", "type_error")
+
+    def test_null_values(self):
+        # Test that nulls are reported as a 422 validation error
+        table = pa.Table.from_pylist([dict(self.row, latitude=None)], schema=PROCESSED_AGENT_DATA_SCHEMA)
+        self.assert_error(table, "latitude", "value_error")
+
+    def test_aware_timestamp_is_normalized_to_naive_utc(self):
+        # Test that an aware timestamp is converted to naive UTC
+        schema = PROCESSED_AGENT_DATA_SCHEMA.set(
+            PROCESSED_AGENT_DATA_SCHEMA.get_field_index("timestamp"),
+            pa.field("timestamp", pa.timestamp("us", tz="Europe/Kyiv")),
+        )
+        kyiv = datetime.timezone(datetime.timedelta(hours=3))
+        row = dict(self.row, timestamp=datetime.datetime(2023, 7, 21, 15, 34, 56, tzinfo=kyiv))
+        table = pa.Table.from_pylist([row], schema=schema)
+        self.assertEqual(conform_arrow_table(table).to_pylist(), [self.row])
+
+class TestReadProcessedAgentDataRows(unittest.TestCase):
+    def test_garbage_arrow_stream(self):
+        # Test that an undecodable Arrow body is rejected with 400
+        request = FakeRequest(b"not an arrow stream", ARROW_STREAM_MEDIA_TYPE)
+        with self.assertRaises(HTTPException) as cm:
+            asyncio.run(read_processed_agent_data_rows(request))
+        self.assertEqual(cm.exception.status_code, 400)
+
+    def test_arrow_stream(self):
+        # Test that a valid Arrow body is decoded into rows
+        row = {
+            "road_state": "normal",
+            "user_id": 1,
+            "x": 0.1,
+            "y": 0.2,
+            "z": 0.3,
+            "latitude": 10.123,
+            "longitude": 20.456,
+            "timestamp": datetime.datetime(2023, 7, 21, 12, 34, 56),
+        }
+        table = pa.Table.from_pylist([row], schema=PROCESSED_AGENT_DATA_SCHEMA)
+        request = FakeRequest(to_arrow_stream(table), ARROW_STREAM_MEDIA_TYPE)
+        self.assertEqual(asyncio.run(read_processed_agent_data_rows(request)), [row])
+
+    def test_json_type_error(self):
+        # Test that a JSON body with a wrong field type is a 422 validation error
+        body = orjson.dumps(
+            [
+                {
+                    "road_state": "normal",
+                    "agent_data": {
+                        "user_id": "one",
+                        "accelerometer": {"x": 0.1, "y": 0.2, "z": 0.3},
+                        "gps": {"latitude": 10.123, "longitude": 20.456},
+                        "timestamp": "2023-07-21T12:34:56Z",
+                    },
+                }
+            ]
+        )
+        request = FakeRequest(body, "application/json")
+        with self.assertRaises(RequestValidationError):
+            asyncio.run(read_processed_agent_data_rows(request))
+
+class TestSendDataToSubscribers(unittest.TestCase):
+    def tearDown(self):
+        main.queues.clear()
+
+    def test_full_queue_drops_oldest_message(self):
+        # Test that a full queue drops its oldest message instead of blocking
+        queue = asyncio.Queue(maxsize=2)
+        main.queues[1] = queue
+        for i in range(3):
+            send_data_to_subscribers(1, [{"id": i}])
+        messages = [orjson.loads(queue.get_nowait()) for _ in range(queue.qsize())]
+        self.assertEqual(messages, [[{"id": 1}], [{"id": 2}]])
+
+    def test_no_subscribers(self):
+        # Test that data for a user without subscribers is discarded
+        send_data_to_subscribers(2, [{"id": 0}])
+        self.assertNotIn(2, main.queues)
+
+if __name__ == "__main__":
+    unittest.main()